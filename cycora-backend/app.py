@@ -5,77 +5,203 @@ In-memory storage (Firebase-ready shape).
 """
 
 from flask import Flask, request, jsonify, send_from_directory
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
-from datetime import datetime, timedelta
-import uuid
+from bisect import bisect_right
+from collections import Counter
+from contextlib import ExitStack
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from itertools import islice
+from typing import NamedTuple
+import ahocorasick
+import atexit
+import bcrypt
+import orjson
 import os
-import re
+import pickle
+import secrets
+import string
+import threading
+import time
+
+
+def _encode_json(obj):
+    """Encode obj to JSON bytes (non-str dict keys are stringified, as Flask does)."""
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _json_response(body):
+    """Wrap an already-encoded JSON body in a response."""
+    return app.response_class(body, mimetype='application/json')
+
+
+def _ok_body(**parts):
+    """Encode {"status": "success", **parts} without building the outer dict.
+
+    Each part is encoded on its own and spliced into a fixed envelope; keys
+    are trusted names from this module and are not escaped.
+    """
+    body = bytearray(b'{"status":"success"')
+    for key, value in parts.items():
+        body += b',"%s":%s' % (key.encode(), _encode_json(value))
+    body += b'}'
+    return bytes(body)
+
+
+def _ok(**parts):
+    return _json_response(_ok_body(**parts))
+
+
+class OrjsonProvider(JSONProvider):
+    """Encode and decode JSON with orjson instead of the stdlib json module."""
+
+    def dumps(self, obj, **kwargs):
+        return _encode_json(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        body = _encode_json(self._prepare_response_obj(args, kwargs))
+        return self._app.response_class(body, mimetype='application/json')
+
 
 app = Flask(__name__, static_folder='../cycora-frontend', static_url_path='')
+app.json = OrjsonProvider(app)
+# Browsers may reuse static assets for an hour, then revalidate via ETag
+STATIC_MAX_AGE = 3600
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = STATIC_MAX_AGE
 CORS(app)
 
+# ─────────────────────────────────────────────
+# PASSWORD HASHING
+# ─────────────────────────────────────────────
+# bcrypt only looks at the first 72 bytes (and rejects longer input), so
+# longer passwords are refused rather than silently truncated
+MAX_PASSWORD_BYTES = 72
+
+
+def _password_bytes(password):
+    """UTF-8 bytes of password, or None if it is not a string bcrypt can hash in full."""
+    if not isinstance(password, str):
+        return None
+    encoded = password.encode()
+    return encoded if len(encoded) <= MAX_PASSWORD_BYTES else None
+
+
+def _hash_password(password):
+    return bcrypt.hashpw(_password_bytes(password), bcrypt.gensalt())
+
+
+# Checked against when the email is unknown, so login takes the same time
+# whether or not an account exists.
+_DUMMY_PASSWORD_HASH = _hash_password("")
+
+
 # ─────────────────────────────────────────────
 # IN-MEMORY DATA STORES
 # ─────────────────────────────────────────────
-users_db = {}           # user_id -> {email, password, name, ...}
+users_db = {}           # user_id -> {email, password (bcrypt hash), name, ...}
+email_index = {}        # email -> user_id
 cycles_db = {}          # user_id -> {last_period_date, cycle_length, period_length, mood}
 moods_db = {}           # user_id -> [{date, mood, symptoms}, ...]
 inner_circle_db = {}    # user_id -> [{friend_email, friend_name, status}, ...]
-community_posts_db = [] # [{id, text, country, timestamp, supports, replies}, ...]
+inner_circle_emails = {}  # user_id -> {friend_email, ...}
+community_posts_db = [] # [{id, text, country, timestamp, supports, replies}, ...], oldest first
+community_posts_by_id = {}  # post_id -> post (same dicts as community_posts_db)
 settings_db = {}        # user_id -> {share_phase, share_support, hide_ovulation, ...}
 
+# Writes to per-user state, and cache rebuilds derived from it, hold one of a
+# fixed set of locks picked by hashing the user id, so threaded workers only
+# serialize requests that touch the same shard. Registration shards by email,
+# since that is its uniqueness key. Community posts share a single lock.
+_USER_LOCK_SHARDS = 16
+_user_locks = [threading.Lock() for _ in range(_USER_LOCK_SHARDS)]
+_posts_lock = threading.Lock()
+
+
+def _user_lock(key):
+    return _user_locks[hash(key) % _USER_LOCK_SHARDS]
+
+
+# Serialized analytics/rewards bodies per user. Both are derived from moods,
+# cycle and inner circle data, so any write to those drops the user's entries.
+# Only users with such data are cached, which bounds both dicts by the stores
+# themselves; everyone else gets a shared default body.
+_analytics_cache = {}   # user_id -> bytes
+_rewards_cache = {}     # user_id -> bytes
+
+
+def _has_tracked_data(user_id):
+    return user_id in moods_db or user_id in cycles_db or user_id in inner_circle_db
+
+
+def _invalidate_user_caches(user_id):
+    _analytics_cache.pop(user_id, None)
+    _rewards_cache.pop(user_id, None)
+
+
+def _normalize_email(email):
+    """Canonical email key; casefold() also folds characters lower() misses (e.g. ß)."""
+    return (email or '').strip().casefold()
+
+
+# (epoch second, ISO string) swapped as one tuple, so concurrent readers never
+# see a half-updated pair
+_now_iso_cache = (0, "")
+
+
+def _now_iso():
+    """Local time as an ISO string at one-second resolution, formatted once per second."""
+    global _now_iso_cache
+    second = int(time.time())
+    cached_second, iso = _now_iso_cache
+    if second != cached_second:
+        iso = datetime.fromtimestamp(second).isoformat()
+        _now_iso_cache = (second, iso)
+    return iso
+
+
+def _new_id():
+    """Random URL-safe ID (16 chars, 96 bits) for stored records."""
+    return secrets.token_urlsafe(12)
+
+
 # Pre-seed community posts for demo
-community_posts_db.extend([
-    {
-        "id": str(uuid.uuid4()),
-        "text": "Feeling a bit overwhelmed today, but grateful for this community. Has anyone else experienced similar shifts in their energy during this phase? Looking for some shared perspective.",
-        "country": "UK",
-        "timestamp": (datetime.now() - timedelta(hours=2)).isoformat(),
-        "supports": 24,
-        "replies": []
-    },
-    {
-        "id": str(uuid.uuid4()),
-        "text": "I finally found the courage to speak up about my health concerns to my doctor. It's a small step, but I wouldn't have done it without the stories I read here. Thank you for making me feel less alone in this journey. ✨",
-        "country": "CANADA",
-        "timestamp": (datetime.now() - timedelta(hours=5)).isoformat(),
-        "supports": 67,
-        "replies": []
-    },
-    {
-        "id": str(uuid.uuid4()),
-        "text": "Practicing mindfulness today. Remember that it's okay to take a break when your body asks for it. We are not machines, we are beautiful, cyclical beings. Sending love to everyone currently in their rest phase. 🌙",
-        "country": "AUSTRALIA",
-        "timestamp": (datetime.now() - timedelta(hours=9)).isoformat(),
-        "supports": 103,
-        "replies": []
-    },
-    {
-        "id": str(uuid.uuid4()),
-        "text": "Day 3 of my period and I just completed a gentle yoga session. It really helps with the cramps! For anyone struggling, try some light stretching — your body will thank you. 🧘‍♀️",
-        "country": "INDIA",
-        "timestamp": (datetime.now() - timedelta(hours=12)).isoformat(),
-        "supports": 45,
-        "replies": []
-    },
+# One clock read for all seed data, so the relative timestamps stay consistent
+NOW = datetime.now()
+
+# (hours ago, country, text, supports), oldest first like later appends
+_SEED_POSTS = [
+    (18, "USA", "Does anyone else get really creative during their follicular phase? I wrote three poems this week! Our cycles are truly powerful. 🎨", 89),
+    (12, "INDIA", "Day 3 of my period and I just completed a gentle yoga session. It really helps with the cramps! For anyone struggling, try some light stretching — your body will thank you. 🧘‍♀️", 45),
+    (9, "AUSTRALIA", "Practicing mindfulness today. Remember that it's okay to take a break when your body asks for it. We are not machines, we are beautiful, cyclical beings. Sending love to everyone currently in their rest phase. 🌙", 103),
+    (5, "CANADA", "I finally found the courage to speak up about my health concerns to my doctor. It's a small step, but I wouldn't have done it without the stories I read here. Thank you for making me feel less alone in this journey. ✨", 67),
+    (2, "UK", "Feeling a bit overwhelmed today, but grateful for this community. Has anyone else experienced similar shifts in their energy during this phase? Looking for some shared perspective.", 24),
+]
+community_posts_db.extend(
     {
-        "id": str(uuid.uuid4()),
-        "text": "Does anyone else get really creative during their follicular phase? I wrote three poems this week! Our cycles are truly powerful. 🎨",
-        "country": "USA",
-        "timestamp": (datetime.now() - timedelta(hours=18)).isoformat(),
-        "supports": 89,
+        "id": _new_id(),
+        "text": text,
+        "country": country,
+        "timestamp": (NOW - timedelta(hours=hours)).isoformat(),
+        "supports": supports,
         "replies": []
-    },
-])
+    }
+    for hours, country, text, supports in _SEED_POSTS
+)
+community_posts_by_id.update((post["id"], post) for post in community_posts_db)
 
 # Pre-seed a demo user
 demo_user_id = "demo-user-001"
 users_db[demo_user_id] = {
     "email": "sarah@example.com",
-    "password": "password123",
+    "password": _hash_password("password123"),
     "name": "Sarah Jenkins",
-    "created_at": datetime.now().isoformat()
+    "created_at": NOW.isoformat()
 }
+email_index[users_db[demo_user_id]["email"]] = demo_user_id
 cycles_db[demo_user_id] = {
     "last_period_date": "2026-02-01",
     "cycle_length": 28,
@@ -94,62 +220,213 @@ inner_circle_db[demo_user_id] = [
     {"friend_email": "mia@example.com", "friend_name": "Mia L.", "status": "connected"},
     {"friend_email": "zoe@example.com", "friend_name": "Zoe R.", "status": "pending"},
 ]
+inner_circle_emails[demo_user_id] = {friend["friend_email"] for friend in inner_circle_db[demo_user_id]}
+
+
+# ─────────────────────────────────────────────
+# SNAPSHOTS
+# ─────────────────────────────────────────────
+# The stores are pickled to STATE_FILE every SNAPSHOT_INTERVAL seconds and
+# reloaded by start_snapshotter(), so a restart keeps accounts, logs and posts.
+# Indices (email_index, inner_circle_emails, community_posts_by_id) are rebuilt
+# on load. Loading happens in the serving process, never at import: a preloaded
+# gunicorn parent would otherwise hand every replacement worker its stale
+# startup state, which that worker's first snapshot would write back.
+STATE_FILE = os.environ.get(
+    'CYCORA_STATE_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'state.pkl')
+)
+SNAPSHOT_INTERVAL = float(os.environ.get('CYCORA_SNAPSHOT_INTERVAL', '10'))
+
+_SNAPSHOT_DICTS = {
+    'users': users_db,
+    'cycles': cycles_db,
+    'moods': moods_db,
+    'friends': inner_circle_db,
+    'settings': settings_db,
+}
+_snapshot_lock = threading.Lock()  # one writer at a time (snapshot thread or atexit)
+_last_snapshot = None
+_snapshotter_started = False
+
+
+def _snapshot_bytes():
+    # Every write path holds a user shard or _posts_lock, so holding all of them
+    # pickles a consistent state without any store changing mid-dump
+    with ExitStack() as stack:
+        for lock in _user_locks:
+            stack.enter_context(lock)
+        stack.enter_context(_posts_lock)
+        return pickle.dumps(
+            {**_SNAPSHOT_DICTS, 'posts': community_posts_db}, protocol=pickle.HIGHEST_PROTOCOL
+        )
+
+
+def _write_snapshot():
+    global _last_snapshot
+    with _snapshot_lock:
+        data = _snapshot_bytes()
+        if data == _last_snapshot:
+            return
+        tmp = STATE_FILE + '.tmp'
+        # Owner-only: the snapshot holds every email, password hash and cycle history
+        with os.fdopen(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, STATE_FILE)
+        _last_snapshot = data
+
+
+def _load_snapshot():
+    try:
+        with open(STATE_FILE, 'rb') as f:
+            state = pickle.load(f)
+    except FileNotFoundError:
+        return
+
+    for name, store in _SNAPSHOT_DICTS.items():
+        store.clear()
+        store.update(state.get(name, {}))
+    community_posts_db[:] = state.get('posts', [])
+
+    email_index.clear()
+    email_index.update((user["email"], uid) for uid, user in users_db.items())
+    inner_circle_emails.clear()
+    inner_circle_emails.update(
+        (uid, {friend["friend_email"] for friend in friends}) for uid, friends in inner_circle_db.items()
+    )
+    community_posts_by_id.clear()
+    community_posts_by_id.update((post["id"], post) for post in community_posts_db)
+
+    # Anything serialized from the previous state is stale
+    _analytics_cache.clear()
+    _rewards_cache.clear()
+    _invalidate_community_cache()
+
+
+def _snapshot_loop():
+    while True:
+        time.sleep(SNAPSHOT_INTERVAL)
+        try:
+            _write_snapshot()
+        except OSError:
+            app.logger.exception('Could not write snapshot to %s', STATE_FILE)
+
+
+def start_snapshotter():
+    """Load the latest snapshot into this process, then snapshot it in the background.
+
+    Call once per serving process before it handles requests. A final
+    snapshot is written at exit.
+    """
+    global _snapshotter_started
+    if _snapshotter_started:
+        return
+    _snapshotter_started = True
+    _load_snapshot()
+    threading.Thread(target=_snapshot_loop, name='cycora-snapshot', daemon=True).start()
+    atexit.register(_write_snapshot)
 
 
 # ─────────────────────────────────────────────
 # CYCLE PREDICTION ENGINE
 # ─────────────────────────────────────────────
+class PhaseInfo(NamedTuple):
+    name: str
+    description: str
+    mood_tip: str
+
+
+# Cycle phases in order
+PHASE_TABLE = (
+    PhaseInfo(
+        "Menstrual",
+        "Your body is shedding the uterine lining. Rest, hydrate, and be gentle with yourself.",
+        "It's normal to feel lower energy. Warm drinks and light movement can help.",
+    ),
+    PhaseInfo(
+        "Follicular",
+        "Estrogen is rising! You may feel more energetic and optimistic during this phase.",
+        "Great time for new projects and social activities.",
+    ),
+    PhaseInfo(
+        "Ovulation",
+        "Peak fertility window. You may feel more confident and social.",
+        "Energy is at its highest. Channel it into meaningful activities.",
+    ),
+    PhaseInfo(
+        "Luteal",
+        "Progesterone rises then drops. Energy may decrease as your period approaches.",
+        "Hydrate and rest. Be gentle with yourself — this phase asks for self-care.",
+    ),
+)
+
+
+def _predict_core(last_ord, cycle_length, period_length, today_ord):
+    """Integer-only prediction core, working on day ordinals.
+
+    Returns (next_ord, ovulation_ord, days_since_period, days_until_period,
+    phase_index), where phase_index points into PHASE_TABLE.
+    """
+    # Next period is the first cycle boundary after today
+    cycles_passed = max(1, (today_ord - last_ord) // cycle_length + 1)
+    next_ord = last_ord + cycles_passed * cycle_length
+
+    # Ovulation is typically 14 days before next period
+    ovulation_ord = next_ord - 14
+
+    # Determine current phase (boundaries clamped so a long period still sorts first)
+    phase_breaks = (period_length, max(period_length, 13), max(period_length, 17))
+    days_since_period = (today_ord - last_ord) % cycle_length
+    phase_index = bisect_right(phase_breaks, days_since_period)
+
+    # Whole days left before the next period starts
+    days_until_period = next_ord - today_ord - 1
+
+    return next_ord, ovulation_ord, days_since_period, days_until_period, phase_index
+
+
 def calculate_predictions(cycle_data):
     """Medical-grade cycle prediction based on user data."""
+    return _cached_predictions(
+        cycle_data.get("last_period_date"),
+        int(cycle_data.get("cycle_length", 28)),
+        int(cycle_data.get("period_length", 5)),
+        date.today().toordinal(),
+    )
+
+
+# Results only change when the cycle data or the date does, and both are part
+# of the key, so edits in store_cycle never need an explicit invalidation.
+# The returned dicts are shared between callers; treat them as read-only.
+@lru_cache(maxsize=1024)
+def _cached_predictions(last_period_date, cycle_length, period_length, today_ord):
+    # strptime rather than date.fromisoformat: it accepts unpadded dates like
+    # "2026-2-1" and rejects compact ones like "20260201", as before
     try:
-        last_period = datetime.strptime(cycle_data["last_period_date"], "%Y-%m-%d")
-    except (ValueError, KeyError):
+        last_period = datetime.strptime(last_period_date, "%Y-%m-%d").date()
+    except (ValueError, TypeError):
         return None
 
-    cycle_length = int(cycle_data.get("cycle_length", 28))
-    period_length = int(cycle_data.get("period_length", 5))
-    today = datetime.now()
-
-    # Calculate next period
-    next_period = last_period + timedelta(days=cycle_length)
-    while next_period < today:
-        next_period += timedelta(days=cycle_length)
-
-    # Ovulation is typically 14 days before next period
-    ovulation_date = next_period - timedelta(days=14)
-    fertile_start = ovulation_date - timedelta(days=2)
-    fertile_end = ovulation_date + timedelta(days=2)
-
-    # Determine current phase
-    days_since_period = (today - last_period).days % cycle_length
-    if days_since_period < period_length:
-        phase = "Menstrual"
-        phase_description = "Your body is shedding the uterine lining. Rest, hydrate, and be gentle with yourself."
-        mood_tip = "It's normal to feel lower energy. Warm drinks and light movement can help."
-    elif days_since_period < 13:
-        phase = "Follicular"
-        phase_description = "Estrogen is rising! You may feel more energetic and optimistic during this phase."
-        mood_tip = "Great time for new projects and social activities."
-    elif days_since_period < 17:
-        phase = "Ovulation"
-        phase_description = "Peak fertility window. You may feel more confident and social."
-        mood_tip = "Energy is at its highest. Channel it into meaningful activities."
-    else:
-        phase = "Luteal"
-        phase_description = "Progesterone rises then drops. Energy may decrease as your period approaches."
-        mood_tip = "Hydrate and rest. Be gentle with yourself — this phase asks for self-care."
-
-    days_until_period = (next_period - today).days
+    next_ord, ovulation_ord, days_since_period, days_until_period, phase_index = _predict_core(
+        last_period.toordinal(), cycle_length, period_length, today_ord
+    )
+    phase, phase_description, mood_tip = PHASE_TABLE[phase_index]
     day_of_cycle = days_since_period + 1
 
+    # Dates are only built here, for formatting
+    next_period = date.fromordinal(next_ord)
+    fertile_start = date.fromordinal(ovulation_ord - 2).strftime("%b %d")
+    fertile_end = date.fromordinal(ovulation_ord + 2).strftime("%b %d")
+
     return {
         "next_period": next_period.strftime("%b %d"),
-        "next_period_full": next_period.strftime("%Y-%m-%d"),
+        "next_period_full": next_period.isoformat(),
         "days_until_period": max(0, days_until_period),
-        "ovulation_date": ovulation_date.strftime("%b %d"),
-        "fertile_start": fertile_start.strftime("%b %d"),
-        "fertile_end": fertile_end.strftime("%b %d"),
-        "fertile_window": f"{fertile_start.strftime('%b %d')}-{fertile_end.strftime('%b %d')}",
+        "ovulation_date": date.fromordinal(ovulation_ord).strftime("%b %d"),
+        "fertile_start": fertile_start,
+        "fertile_end": fertile_end,
+        "fertile_window": f"{fertile_start}-{fertile_end}",
         "phase": phase,
         "phase_description": phase_description,
         "mood_tip": mood_tip,
@@ -284,7 +561,7 @@ CHATBOT_RESPONSES = {
         "response": "You're so welcome! 🤗 I'm always here whenever you need support, information, or just someone to talk to about your cycle.\n\nRemember: understanding your body is an act of self-love. You're doing amazing by being proactive about your health! 💪\n\nFeel free to come back anytime! ❤️",
         "emoji": "🌸"
     },
-    "self.care": {
+    "self care": {
         "response": "Self-care during your cycle isn't luxury — it's ESSENTIAL! Here's a phase-by-phase guide:\n\n❄️ **Menstrual:** Warm baths, cozy blankets, journaling, gentle yoga\n🌱 **Follicular:** Try new things, socialize, creative projects\n☀️ **Ovulation:** Dress up, connect with friends, tackle big tasks\n🌙 **Luteal:** Wind down, skincare routine, reading, early bedtimes\n\n🎯 **Daily non-negotiables:**\n• 5 minutes of deep breathing\n• One glass of water upon waking\n• Moving your body in any way that feels good\n\nYou deserve care in every phase. 💛",
         "emoji": "💛"
     },
@@ -309,61 +586,130 @@ FALLBACK_RESPONSE = {
 }
 
 
+# Keyword matching is plain substring presence via the automaton below.
+# Keep regex out of it; to catch different words for the same thing (e.g.
+# "tired" and "exhausted"), add each word as its own keyword instead of an
+# alternation pattern. A stem already covers its longer forms ("cramp"
+# matches "cramping").
+
+# Compile every keyword into one Aho-Corasick automaton at import, so a
+# message is matched in a single pass instead of one substring scan per
+# keyword. Values rank matches: longer keywords win, ties go to the keyword
+# listed first in CHATBOT_RESPONSES.
+_kw_automaton = ahocorasick.Automaton()
+for _rank, (_keyword, _data) in enumerate(CHATBOT_RESPONSES.items()):
+    _kw_automaton.add_word(_keyword, (len(_keyword), -_rank, _keyword))
+_kw_automaton.make_automaton()
+
+
+def _find_keyword(message_lower):
+    """Return the best-matching keyword for a normalized message, or None."""
+    # Longer keyword matches are better (more specific)
+    best = max((match for _, match in _kw_automaton.iter(message_lower)), default=None)
+    return best[2] if best else None
+
+
+# Only short messages are memoized: the cache key is the whole message, so
+# caching arbitrary lengths would let 4096 huge messages pin memory
+_KEYWORD_CACHE_MAX_LEN = 512
+_cached_find_keyword = lru_cache(maxsize=4096)(_find_keyword)
+
+
+def _match_keyword(message_lower):
+    """Return the best-matching keyword for a normalized message, or None."""
+    if len(message_lower) > _KEYWORD_CACHE_MAX_LEN:
+        return _find_keyword(message_lower)
+    return _cached_find_keyword(message_lower)
+
+
+# Punctuation becomes spaces, so "self-care" and "self.care" both match "self care"
+_PUNCT_TABLE = str.maketrans(string.punctuation, " " * len(string.punctuation))
+
+
+def _chatbot_keyword(message):
+    """Normalize a chat message and return its best keyword, or None."""
+    return _match_keyword(message.translate(_PUNCT_TABLE).lower())
+
+
 def get_chatbot_response(message):
     """Keyword-based chatbot with intelligent matching."""
-    message_lower = message.lower().strip()
+    return CHATBOT_RESPONSES.get(_chatbot_keyword(message), FALLBACK_RESPONSE)
+
+
+def _chat_body(data):
+    return _ok_body(response=data['response'], emoji=data.get('emoji', '❤️'))
+
 
-    # Check each keyword against the message
-    best_match = None
-    best_score = 0
+# /api/chat bodies for replies without personalization, encoded once at
+# import. Keyed like _match_keyword's result; None is the fallback.
+_CHATBOT_BODIES = {keyword: _chat_body(data) for keyword, data in CHATBOT_RESPONSES.items()}
+_CHATBOT_BODIES[None] = _chat_body(FALLBACK_RESPONSE)
 
-    for keyword, data in CHATBOT_RESPONSES.items():
-        # Check if keyword appears in the message
-        if keyword in message_lower:
-            # Longer keyword matches are better (more specific)
-            score = len(keyword)
-            if score > best_score:
-                best_score = score
-                best_match = data
 
-    if best_match:
-        return best_match
-    return FALLBACK_RESPONSE
+@lru_cache(maxsize=1024)
+def _personalize(phase, day_of_cycle, cycle_length, mood_tip):
+    """Cycle-aware note appended to chat replies."""
+    return f"\n\n📅 *Based on your cycle data, you're currently in your **{phase} phase** (Day {day_of_cycle} of {cycle_length}). {mood_tip}*"
 
 
 # ─────────────────────────────────────────────
 # API ROUTES
 # ─────────────────────────────────────────────
 
+def _json_body():
+    """Request JSON object, or None when the body is missing, malformed or not an object."""
+    data = request.get_json(silent=True, cache=False)
+    return data if isinstance(data, dict) else None
+
+
+def _invalid_body():
+    return jsonify({"status": "error", "message": "Request body must be a JSON object"}), 400
+
+
 @app.route('/')
 def serve_frontend():
     """Serve the unified frontend SPA."""
-    return send_from_directory(app.static_folder, 'index.html')
+    response = send_from_directory(app.static_folder, 'index.html', max_age=STATIC_MAX_AGE, conditional=True)
+    response.cache_control.must_revalidate = True
+    return response
 
 
 # ── Auth ──────────────────────────────────────
 @app.route('/api/register', methods=['POST'])
 def register():
-    data = request.json
-    email = data.get('email', '').strip().lower()
+    data = _json_body()
+    if data is None:
+        return _invalid_body()
+    email = _normalize_email(data.get('email'))
     password = data.get('password', '')
     name = data.get('name', '')
 
     if not email or not password:
         return jsonify({"status": "error", "message": "Email and password are required"}), 400
 
-    # Check if email already exists
-    for uid, user in users_db.items():
-        if user['email'] == email:
+    password_bytes = _password_bytes(password)
+    if password_bytes is None:
+        return jsonify({
+            "status": "error",
+            "message": f"Password must be text of at most {MAX_PASSWORD_BYTES} bytes"
+        }), 400
+
+    # Hash outside the lock; bcrypt is deliberately slow
+    password_hash = bcrypt.hashpw(password_bytes, bcrypt.gensalt())
+
+    with _user_lock(email):
+        # Check if email already exists
+        if email in email_index:
             return jsonify({"status": "error", "message": "Email already registered"}), 409
 
-    user_id = str(uuid.uuid4())
-    users_db[user_id] = {
-        "email": email,
-        "password": password,
-        "name": name,
-        "created_at": datetime.now().isoformat()
-    }
+        user_id = _new_id()
+        users_db[user_id] = {
+            "email": email,
+            "password": password_hash,
+            "name": name,
+            "created_at": datetime.now().isoformat()
+        }
+        email_index[email] = user_id
 
     return jsonify({
         "status": "success",
@@ -376,19 +722,25 @@ def register():
 
 @app.route('/api/login', methods=['POST'])
 def login():
-    data = request.json
-    email = data.get('email', '').strip().lower()
+    data = _json_body()
+    if data is None:
+        return _invalid_body()
+    email = _normalize_email(data.get('email'))
     password = data.get('password', '')
 
-    for uid, user in users_db.items():
-        if user['email'] == email and user['password'] == password:
-            return jsonify({
-                "status": "success",
-                "message": "Login successful",
-                "user_id": uid,
-                "name": user.get('name', ''),
-                "email": user['email']
-            })
+    uid = email_index.get(email)
+    user = users_db.get(uid)
+    password_hash = user['password'] if user else _DUMMY_PASSWORD_HASH
+    # A non-string or over-long password can't match any stored hash
+    password_bytes = _password_bytes(password)
+    if password_bytes is not None and bcrypt.checkpw(password_bytes, password_hash) and user:
+        return jsonify({
+            "status": "success",
+            "message": "Login successful",
+            "user_id": uid,
+            "name": user.get('name', ''),
+            "email": user['email']
+        })
 
     return jsonify({"status": "error", "message": "Invalid email or password"}), 401
 
@@ -396,19 +748,24 @@ def login():
 # ── Cycle Data ────────────────────────────────
 @app.route('/api/cycle', methods=['POST'])
 def store_cycle():
-    data = request.json
+    data = _json_body()
+    if data is None:
+        return _invalid_body()
     user_id = data.get('user_id')
     if not user_id:
         return jsonify({"status": "error", "message": "user_id required"}), 400
 
-    cycles_db[user_id] = {
+    cycle_data = {
         "last_period_date": data.get('last_period_date'),
         "cycle_length": int(data.get('cycle_length', 28)),
         "period_length": int(data.get('period_length', 5)),
         "mood": data.get('mood', '')
     }
+    with _user_lock(user_id):
+        cycles_db[user_id] = cycle_data
+        _invalidate_user_caches(user_id)
 
-    predictions = calculate_predictions(cycles_db[user_id])
+    predictions = calculate_predictions(cycle_data)
     return jsonify({
         "status": "success",
         "message": "Cycle data stored successfully",
@@ -435,7 +792,9 @@ def get_prediction(user_id):
 # ── Mood Logging ──────────────────────────────
 @app.route('/api/mood', methods=['POST'])
 def log_mood():
-    data = request.json
+    data = _json_body()
+    if data is None:
+        return _invalid_body()
     user_id = data.get('user_id')
     if not user_id:
         return jsonify({"status": "error", "message": "user_id required"}), 400
@@ -446,9 +805,9 @@ def log_mood():
         "symptoms": data.get('symptoms', [])
     }
 
-    if user_id not in moods_db:
-        moods_db[user_id] = []
-    moods_db[user_id].append(entry)
+    with _user_lock(user_id):
+        moods_db.setdefault(user_id, []).append(entry)
+        _invalidate_user_caches(user_id)
 
     return jsonify({"status": "success", "message": "Mood logged successfully"})
 
@@ -462,31 +821,35 @@ def get_moods(user_id):
 # ── Inner Circle ──────────────────────────────
 @app.route('/api/inner-circle/invite', methods=['POST'])
 def invite_friend():
-    data = request.json
+    data = _json_body()
+    if data is None:
+        return _invalid_body()
     user_id = data.get('user_id')
-    friend_email = data.get('friend_email', '').strip().lower()
+    friend_email = _normalize_email(data.get('friend_email'))
     friend_name = data.get('friend_name', 'Friend')
 
     if not user_id or not friend_email:
         return jsonify({"status": "error", "message": "user_id and friend_email required"}), 400
 
-    if user_id not in inner_circle_db:
-        inner_circle_db[user_id] = []
+    with _user_lock(user_id):
+        friends = inner_circle_db.setdefault(user_id, [])
+        friend_emails = inner_circle_emails.setdefault(user_id, set())
 
-    # Check limit
-    if len(inner_circle_db[user_id]) >= 10:
-        return jsonify({"status": "error", "message": "Inner Circle is full (max 10 friends)"}), 400
+        # Check limit
+        if len(friends) >= 10:
+            return jsonify({"status": "error", "message": "Inner Circle is full (max 10 friends)"}), 400
 
-    # Check duplicate
-    for friend in inner_circle_db[user_id]:
-        if friend['friend_email'] == friend_email:
+        # Check duplicate
+        if friend_email in friend_emails:
             return jsonify({"status": "error", "message": "Friend already in your Inner Circle"}), 409
 
-    inner_circle_db[user_id].append({
-        "friend_email": friend_email,
-        "friend_name": friend_name,
-        "status": "pending"
-    })
+        friends.append({
+            "friend_email": friend_email,
+            "friend_name": friend_name,
+            "status": "pending"
+        })
+        friend_emails.add(friend_email)
+        _invalidate_user_caches(user_id)
 
     return jsonify({"status": "success", "message": f"Invitation sent to {friend_email}"})
 
@@ -494,80 +857,136 @@ def invite_friend():
 @app.route('/api/inner-circle/<user_id>', methods=['GET'])
 def get_inner_circle(user_id):
     friends = inner_circle_db.get(user_id, [])
-    return jsonify({
-        "status": "success",
-        "friends": friends,
-        "count": len(friends)
-    })
+    return _ok(friends=friends, count=len(friends))
 
 
 # ── Community ─────────────────────────────────
+# Pagination is opt-in: without ?limit= the whole feed is returned, which is
+# what the SPA's single fetch expects. An explicit limit is capped.
+COMMUNITY_MAX_PAGE_SIZE = 100
+
+# Serialized first pages of the feed, keyed by page size (None for the whole
+# feed) and rebuilt on the next read after any post mutation. Deeper pages are
+# built per request.
+_community_cache = {}
+
+
+def _invalidate_community_cache():
+    _community_cache.clear()
+
+
+def _community_page(offset, limit):
+    """Encode `limit` posts (all if None), newest first, skipping the `offset` newest."""
+    total = len(community_posts_db)
+    end = max(0, total - offset)
+    start = 0 if limit is None else max(0, end - limit)
+    # Posts are only ever appended, so newest first is the list's tail reversed
+    page = community_posts_db[start:end][::-1]
+    return _ok_body(posts=page, total=total)
+
+
 @app.route('/api/community/posts', methods=['GET'])
 def get_community_posts():
-    # Return sorted by newest first
-    sorted_posts = sorted(community_posts_db, key=lambda x: x['timestamp'], reverse=True)
-    return jsonify({"status": "success", "posts": sorted_posts})
+    offset = max(0, request.args.get('offset', 0, type=int))
+    limit = request.args.get('limit', type=int)
+    if limit is not None:
+        limit = min(max(1, limit), COMMUNITY_MAX_PAGE_SIZE)
+    if offset:
+        return _json_response(_community_page(offset, limit))
+
+    body = _community_cache.get(limit)
+    if body is None:
+        # Rebuild under the lock so a concurrent write can't be overwritten
+        # by a stale body
+        with _posts_lock:
+            body = _community_cache.get(limit)
+            if body is None:
+                body = _community_cache[limit] = _community_page(0, limit)
+    return _json_response(body)
 
 
 @app.route('/api/community/posts', methods=['POST'])
 def create_community_post():
-    data = request.json
+    data = _json_body()
+    if data is None:
+        return _invalid_body()
     post = {
-        "id": str(uuid.uuid4()),
+        "id": _new_id(),
         "text": data.get('text', ''),
         "country": data.get('country', 'GLOBAL'),
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": _now_iso(),
         "supports": 0,
         "replies": []
     }
-    community_posts_db.append(post)
+    with _posts_lock:
+        community_posts_by_id[post['id']] = post
+        community_posts_db.append(post)
+        _invalidate_community_cache()
     return jsonify({"status": "success", "message": "Post created", "post": post}), 201
 
 
 @app.route('/api/community/posts/<post_id>/support', methods=['POST'])
 def support_post(post_id):
-    for post in community_posts_db:
-        if post['id'] == post_id:
-            post['supports'] += 1
-            return jsonify({"status": "success", "supports": post['supports']})
-    return jsonify({"status": "error", "message": "Post not found"}), 404
+    post = community_posts_by_id.get(post_id)
+    if post is None:
+        return jsonify({"status": "error", "message": "Post not found"}), 404
+    with _posts_lock:
+        post['supports'] += 1
+        supports = post['supports']
+        _invalidate_community_cache()
+    return jsonify({"status": "success", "supports": supports})
 
 
 @app.route('/api/community/posts/<post_id>/reply', methods=['POST'])
 def reply_to_post(post_id):
-    data = request.json
-    for post in community_posts_db:
-        if post['id'] == post_id:
-            reply = {
-                "id": str(uuid.uuid4()),
-                "text": data.get('text', ''),
-                "timestamp": datetime.now().isoformat(),
-            }
-            post['replies'].append(reply)
-            return jsonify({"status": "success", "reply": reply})
-    return jsonify({"status": "error", "message": "Post not found"}), 404
+    data = _json_body()
+    if data is None:
+        return _invalid_body()
+    post = community_posts_by_id.get(post_id)
+    if post is None:
+        return jsonify({"status": "error", "message": "Post not found"}), 404
+    reply = {
+        "id": _new_id(),
+        "text": data.get('text', ''),
+        "timestamp": _now_iso(),
+    }
+    with _posts_lock:
+        post['replies'].append(reply)
+        _invalidate_community_cache()
+    return jsonify({"status": "success", "reply": reply})
 
 
 # ── AI Chatbot ────────────────────────────────
 @app.route('/api/chat', methods=['POST'])
 def chat():
-    data = request.json
-    message = data.get('message', '')
+    data = _json_body()
+    if data is None:
+        return _invalid_body()
+    message = data.get('message') or ''
     user_id = data.get('user_id', '')
 
-    if not message.strip():
+    # isspace() tests blankness without allocating a stripped copy
+    if not isinstance(message, str) or not message or message.isspace():
         return jsonify({"status": "error", "message": "Message cannot be empty"}), 400
 
     # Get keyword-based response
-    result = get_chatbot_response(message)
+    keyword = _chatbot_keyword(message)
 
-    # Personalize with cycle data if available
+    # Personalize with cycle data if available (predictions are memoized per
+    # cycle data and day, so repeat chat turns don't redo the cycle math)
     personalization = ""
-    if user_id and user_id in cycles_db:
-        predictions = calculate_predictions(cycles_db[user_id])
+    cycle_data = cycles_db.get(user_id)
+    if cycle_data:
+        predictions = calculate_predictions(cycle_data)
         if predictions:
-            personalization = f"\n\n📅 *Based on your cycle data, you're currently in your **{predictions['phase']} phase** (Day {predictions['day_of_cycle']} of {predictions['cycle_length']}). {predictions['mood_tip']}*"
+            personalization = _personalize(
+                predictions['phase'], predictions['day_of_cycle'], predictions['cycle_length'], predictions['mood_tip']
+            )
+
+    if not personalization:
+        return _json_response(_CHATBOT_BODIES[keyword])
 
+    result = CHATBOT_RESPONSES.get(keyword, FALLBACK_RESPONSE)
     return jsonify({
         "status": "success",
         "response": result['response'] + personalization,
@@ -576,102 +995,159 @@ def chat():
 
 
 # ── Settings ──────────────────────────────────
+DEFAULT_SETTINGS = {
+    "share_phase": True,
+    "share_support": True,
+    "hide_ovulation": False,
+    "pause_sharing": False,
+    "period_reminder": True,
+    "daily_logging": True,
+    "ovulation_reminder": False,
+    "circle_updates": True,
+    "preparedness_alerts": True,
+    "educational_insights": True,
+    "post_anonymously": True,
+    "show_country": False,
+    "allow_replies": True,
+}
+# Body for users who never saved settings, encoded once
+DEFAULT_SETTINGS_BODY = _ok_body(settings=DEFAULT_SETTINGS)
+
+
 @app.route('/api/settings/<user_id>', methods=['GET'])
 def get_settings(user_id):
-    default_settings = {
-        "share_phase": True,
-        "share_support": True,
-        "hide_ovulation": False,
-        "pause_sharing": False,
-        "period_reminder": True,
-        "daily_logging": True,
-        "ovulation_reminder": False,
-        "circle_updates": True,
-        "preparedness_alerts": True,
-        "educational_insights": True,
-        "post_anonymously": True,
-        "show_country": False,
-        "allow_replies": True,
-    }
-    user_settings = settings_db.get(user_id, default_settings)
-    return jsonify({"status": "success", "settings": user_settings})
+    user_settings = settings_db.get(user_id)
+    if user_settings is None:
+        return _json_response(DEFAULT_SETTINGS_BODY)
+    return _ok(settings=user_settings)
 
 
 @app.route('/api/settings/<user_id>', methods=['PUT'])
 def update_settings(user_id):
-    data = request.json
-    if user_id not in settings_db:
-        settings_db[user_id] = {}
-    settings_db[user_id].update(data)
+    data = _json_body()
+    if data is None:
+        return _invalid_body()
+    with _user_lock(user_id):
+        settings_db.setdefault(user_id, {}).update(data)
     return jsonify({"status": "success", "message": "Settings updated"})
 
 
 # ── Analytics ─────────────────────────────────
+# Analytics body specialized at import: only average cycle length, symptom
+# frequency and mood distribution vary per user
+_ANALYTICS_TEMPLATE = (
+    b'{"status":"success","analytics":{'
+    b'"average_cycle_length":%d,'
+    b'"symptom_frequency":%s,'
+    b'"mood_distribution":%s,'
+    b'"preparedness_score":80,'
+    b'"friend_checkins":3,'
+    b'"bleeding_pattern":{"light":30,"medium":50,"heavy":20}}}'
+)
+# Default data for demo, shown until a user has logged symptoms or moods
+_DEFAULT_SYMPTOMS_JSON = _encode_json({"Cramps": 12, "Fatigue": 9, "Headache": 5, "Irritation": 4})
+_DEFAULT_MOODS_JSON = _encode_json({"Low Energy": 8, "Stable": 5, "Slightly Low": 3})
+
+
 @app.route('/api/analytics/<user_id>', methods=['GET'])
 def get_analytics(user_id):
     """Return analytics data for the insights screen."""
-    mood_entries = moods_db.get(user_id, [])
-    cycle_data = cycles_db.get(user_id, {})
-
+    body = _analytics_cache.get(user_id)
+    if body is None:
+        if not _has_tracked_data(user_id):
+            return _json_response(_DEFAULT_ANALYTICS_BODY)
+        with _user_lock(user_id):
+            body = _analytics_cache[user_id] = _render_analytics(
+                moods_db.get(user_id, []), cycles_db.get(user_id, {})
+            )
+    return _json_response(body)
+
+
+def _render_analytics(mood_entries, cycle_data):
     # Calculate symptom frequency
-    symptom_counts = {}
-    mood_counts = {}
+    symptom_counts = Counter()
+    mood_counts = Counter()
     for entry in mood_entries:
-        for symptom in entry.get('symptoms', []):
-            symptom_counts[symptom] = symptom_counts.get(symptom, 0) + 1
+        symptom_counts.update(entry.get('symptoms', ()))
         mood = entry.get('mood', '')
         if mood:
-            mood_counts[mood] = mood_counts.get(mood, 0) + 1
+            mood_counts[mood] += 1
 
-    # Default data for demo
-    if not symptom_counts:
-        symptom_counts = {"Cramps": 12, "Fatigue": 9, "Headache": 5, "Irritation": 4}
-    if not mood_counts:
-        mood_counts = {"Low Energy": 8, "Stable": 5, "Slightly Low": 3}
+    return _ANALYTICS_TEMPLATE % (
+        cycle_data.get("cycle_length", 27),
+        _encode_json(symptom_counts) if symptom_counts else _DEFAULT_SYMPTOMS_JSON,
+        _encode_json(mood_counts) if mood_counts else _DEFAULT_MOODS_JSON,
+    )
 
-    return jsonify({
-        "status": "success",
-        "analytics": {
-            "average_cycle_length": cycle_data.get("cycle_length", 27),
-            "symptom_frequency": symptom_counts,
-            "mood_distribution": mood_counts,
-            "preparedness_score": 80,
-            "friend_checkins": 3,
-            "bleeding_pattern": {"light": 30, "medium": 50, "heavy": 20},
-        }
-    })
+
+# Served, without caching, for users with no moods, cycle or inner circle
+_DEFAULT_ANALYTICS_BODY = _render_analytics([], {})
 
 
 # ── Rewards ───────────────────────────────────
+# (name, icon) for each badge, in display order
+BADGE_TEMPLATES = (
+    ("First Cycle Logged", "calendar_today"),
+    ("7-Day Streak", "bolt"),
+    ("Phase Explorer", "explore"),
+    ("Mood Tracker", "sentiment_satisfied"),
+    ("Supportive Friend", "group"),
+)
+# Each badge pre-encoded in both states: _BADGE_JSON[i][unlocked]
+_BADGE_JSON = tuple(
+    tuple(_encode_json({"name": name, "icon": icon, "unlocked": flag}) for flag in (False, True))
+    for name, icon in BADGE_TEMPLATES
+)
+# Rewards body specialized at import: level, points, next level, logs and badges vary
+_REWARDS_TEMPLATE = (
+    b'{"status":"success","rewards":{'
+    b'"level":%d,'
+    b'"points":%d,'
+    b'"next_level_points":%d,'
+    b'"streak":7,'
+    b'"total_logs":%d,'
+    b'"badges":[%s]}}'
+)
+
+
 @app.route('/api/rewards/<user_id>', methods=['GET'])
 def get_rewards(user_id):
     """Return gamification data."""
-    mood_entries = len(moods_db.get(user_id, []))
-    friends = len(inner_circle_db.get(user_id, []))
-    has_cycle = user_id in cycles_db
-
+    body = _rewards_cache.get(user_id)
+    if body is None:
+        if not _has_tracked_data(user_id):
+            return _json_response(_DEFAULT_REWARDS_BODY)
+        with _user_lock(user_id):
+            body = _rewards_cache[user_id] = _render_rewards(
+                len(moods_db.get(user_id, [])),
+                len(inner_circle_db.get(user_id, [])),
+                user_id in cycles_db,
+            )
+    return _json_response(body)
+
+
+def _render_rewards(mood_entries, friends, has_cycle):
     points = (mood_entries * 5) + (friends * 15) + (50 if has_cycle else 0)
     level = min(points // 100 + 1, 10)
 
-    badges = []
-    if has_cycle:
-        badges.append({"name": "First Cycle Logged", "icon": "calendar_today", "unlocked": True})
-    badges.append({"name": "7-Day Streak", "icon": "bolt", "unlocked": mood_entries >= 7})
-    badges.append({"name": "Phase Explorer", "icon": "explore", "unlocked": has_cycle})
-    badges.append({"name": "Mood Tracker", "icon": "sentiment_satisfied", "unlocked": mood_entries >= 14})
-    badges.append({"name": "Supportive Friend", "icon": "group", "unlocked": friends >= 3})
+    unlocked = (has_cycle, mood_entries >= 7, has_cycle, mood_entries >= 14, friends >= 3)
+    # "First Cycle Logged" is only listed once it is earned
+    first = 0 if has_cycle else 1
+    badges = b','.join(
+        variants[flag] for variants, flag in islice(zip(_BADGE_JSON, unlocked), first, None)
+    )
 
-    return jsonify({
-        "status": "success",
-        "rewards": {
-            "level": level,
-            "points": points if points > 0 else 320,
-            "next_level_points": (level) * 100 + 100,
-            "streak": 7,
-            "total_logs": mood_entries if mood_entries > 0 else 45,
-            "badges": badges
-        }
-    })
+    return _REWARDS_TEMPLATE % (
+        level,
+        points if points > 0 else 320,
+        (level) * 100 + 100,
+        mood_entries if mood_entries > 0 else 45,
+        badges,
+    )
+
+
+# Served, without caching, for users with no moods, cycle or inner circle
+_DEFAULT_REWARDS_BODY = _render_rewards(0, 0, False)
 
 
 if __name__ == '__main__':
@@ -680,5 +1156,10 @@ if __name__ == '__main__':
     print("  📡 API running at http://localhost:5001/api")
     print("  🌐 Frontend at http://localhost:5001")
     print("="*50 + "\n")
-    app.run(debug=True, port=5001)
+    # Debugger and reloader only on request; use gunicorn_conf.py for deployment
+    debug = os.environ.get('FLASK_DEBUG') == '1'
+    # With the reloader on, only the serving child (not the watcher) writes snapshots
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_snapshotter()
+    app.run(debug=debug, port=5001)
 
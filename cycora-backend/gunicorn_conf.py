@@ -0,0 +1,26 @@
+"""
+Gunicorn settings for the Cycora backend.
+Run with: gunicorn -c gunicorn_conf.py app:app
+"""
+
+import multiprocessing
+
+bind = "0.0.0.0:5001"
+
+# All data lives in the app process's memory, so there must be exactly one
+# worker; each extra worker would hold its own copy of every store. Concurrency
+# comes from threads, which the per-user locks in app.py make safe.
+workers = 1
+worker_class = "gthread"
+threads = 4 * multiprocessing.cpu_count()
+
+# Import the app (and build its automaton, seed data and hashes) once, before forking
+preload_app = True
+
+
+def post_fork(server, worker):
+    # Each worker, including a replacement after a crash or timeout, loads the
+    # latest snapshot itself rather than inheriting the parent's startup state,
+    # and starts its own snapshot thread (threads don't survive the fork)
+    from app import start_snapshotter
+    start_snapshotter()
@@ -0,0 +1,43 @@
+import os
+import pickle
+import sys
+import tempfile
+
+import pytest
+
+# Keep the suite away from a real cycora-backend/state.pkl
+os.environ['CYCORA_STATE_FILE'] = os.path.join(tempfile.mkdtemp(), 'state.pkl')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as cycora  # noqa: E402
+
+# Seeded startup state, restored before every test
+_BASELINE = cycora._snapshot_bytes()
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(tmp_path, monkeypatch):
+    baseline = tmp_path / 'baseline.pkl'
+    baseline.write_bytes(_BASELINE)
+    monkeypatch.setattr(cycora, 'STATE_FILE', str(baseline))
+    cycora._load_snapshot()
+    cycora._analytics_cache.clear()
+    cycora._rewards_cache.clear()
+    cycora._invalidate_community_cache()
+
+    monkeypatch.setattr(cycora, 'STATE_FILE', str(tmp_path / 'state.pkl'))
+    monkeypatch.setattr(cycora, '_last_snapshot', None)
+
+
+@pytest.fixture
+def client():
+    return cycora.app.test_client()
+
+
+@pytest.fixture
+def load_state_file():
+    """Return a function that unpickles the current STATE_FILE."""
+    def load():
+        with open(cycora.STATE_FILE, 'rb') as f:
+            return pickle.load(f)
+    return load
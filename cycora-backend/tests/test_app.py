@@ -0,0 +1,414 @@
+import os
+import threading
+from datetime import datetime, time, timedelta
+
+import pytest
+
+import app as cycora
+
+DEMO = 'demo-user-001'
+
+
+def _register(client, email='new@user.com', password='secret'):
+    response = client.post('/api/register', json={'email': email, 'password': password, 'name': 'New'})
+    assert response.status_code == 201
+    return response.get_json()['user_id']
+
+
+# ── Request bodies ────────────────────────────
+BAD_BODIES = [
+    {},                                                         # no body
+    {'data': '{bad', 'content_type': 'application/json'},       # malformed JSON
+    {'json': [1, 2]},                                           # not an object
+    {'json': 'text'},
+    {'data': 'share_phase=1', 'content_type': 'text/plain'},    # not JSON at all
+]
+WRITE_ROUTES = [
+    ('post', '/api/register'),
+    ('post', '/api/login'),
+    ('post', '/api/cycle'),
+    ('post', '/api/mood'),
+    ('post', '/api/inner-circle/invite'),
+    ('post', '/api/community/posts'),
+    ('post', '/api/community/posts/{post_id}/reply'),
+    ('post', '/api/chat'),
+    ('put', f'/api/settings/{DEMO}'),
+]
+
+
+@pytest.mark.parametrize('method, route', WRITE_ROUTES)
+@pytest.mark.parametrize('kwargs', BAD_BODIES)
+def test_non_object_bodies_are_rejected(client, method, route, kwargs):
+    post = cycora.community_posts_db[-1]
+    replies = len(post['replies'])
+    route = route.format(post_id=post['id'])
+
+    response = getattr(client, method)(route, **kwargs)
+    assert response.status_code == 400
+    assert response.get_json()['status'] == 'error'
+
+    assert len(cycora.community_posts_db) == 5
+    assert len(post['replies']) == replies
+    assert DEMO not in cycora.settings_db
+    assert client.get(f'/api/settings/{DEMO}').get_json()['settings'] == cycora.DEFAULT_SETTINGS
+
+
+# ── Auth ──────────────────────────────────────
+def _login(client, email, password):
+    return client.post('/api/login', json={'email': email, 'password': password}).status_code
+
+
+def test_login_checks_bcrypt_hash(client):
+    _register(client)
+    assert cycora.users_db[cycora.email_index['new@user.com']]['password'].startswith(b'$2')
+    assert _login(client, 'new@user.com', 'secret') == 200
+    assert _login(client, 'new@user.com', 'wrong') == 401
+
+
+def test_unknown_email_is_checked_against_dummy_hash(client, monkeypatch):
+    checked = []
+    real_checkpw = cycora.bcrypt.checkpw
+    monkeypatch.setattr(cycora.bcrypt, 'checkpw', lambda pw, hashed: checked.append(hashed) or real_checkpw(pw, hashed))
+    assert _login(client, 'nobody@example.com', 'secret') == 401
+    assert checked == [cycora._DUMMY_PASSWORD_HASH]
+
+
+@pytest.mark.parametrize('password', [123, None, ['secret'], {'p': 1}])
+def test_non_string_passwords(client, password):
+    body = {'email': 'typed@user.com', 'password': password}
+    assert client.post('/api/register', json=body).status_code == 400
+    assert _login(client, 'sarah@example.com', password) == 401
+
+
+def test_passwords_over_72_bytes(client):
+    body = {'email': 'long@user.com', 'password': 'a' * 73}
+    assert client.post('/api/register', json=body).status_code == 400
+    # Multi-byte characters count by their UTF-8 length
+    body = {'email': 'long@user.com', 'password': 'é' * 37}
+    assert client.post('/api/register', json=body).status_code == 400
+
+    _register(client, 'long@user.com', 'a' * 72)
+    assert _login(client, 'long@user.com', 'a' * 72) == 200
+    assert _login(client, 'long@user.com', 'a' * 72 + 'b' * 5) == 401
+
+
+def test_emails_match_case_insensitively(client):
+    _register(client, '  New@User.COM ')
+    assert cycora.email_index['new@user.com']
+    assert client.post('/api/register', json={'email': 'NEW@user.com', 'password': 'x'}).status_code == 409
+    assert _login(client, 'new@USER.com', 'secret') == 200
+    # casefold() also folds characters lower() leaves alone
+    _register(client, 'STRASSE@example.com')
+    assert _login(client, 'straße@example.com', 'secret') == 200
+
+
+# ── Chatbot ───────────────────────────────────
+@pytest.mark.parametrize('message, keyword', [
+    ('Any self-care ideas?', 'self care'),
+    ('self.care please', 'self care'),
+    ('CRAMPS!!', 'cramp'),
+    ('my period pain, help', 'period'),
+    ('hi', None),
+])
+def test_chat_keywords_ignore_punctuation_and_case(client, message, keyword):
+    assert cycora._chatbot_keyword(message) == keyword
+    reply = client.post('/api/chat', json={'message': message}).get_json()
+    expected = cycora.CHATBOT_RESPONSES.get(keyword, cycora.FALLBACK_RESPONSE)
+    assert reply['response'] == expected['response']
+
+
+def test_long_messages_bypass_keyword_cache():
+    cycora._cached_find_keyword.cache_clear()
+    assert cycora._match_keyword('x' * 10_000 + ' cramp') == 'cramp'
+    assert cycora._cached_find_keyword.cache_info().currsize == 0
+
+
+# ── Analytics / rewards cache invalidation ────
+def test_mood_log_invalidates_analytics_and_rewards(client):
+    before_analytics = client.get(f'/api/analytics/{DEMO}').get_json()['analytics']
+    before_rewards = client.get(f'/api/rewards/{DEMO}').get_json()['rewards']
+    assert DEMO in cycora._analytics_cache and DEMO in cycora._rewards_cache
+
+    client.post('/api/mood', json={'user_id': DEMO, 'mood': 'Stable', 'symptoms': ['Cramps']})
+    assert DEMO not in cycora._analytics_cache and DEMO not in cycora._rewards_cache
+
+    analytics = client.get(f'/api/analytics/{DEMO}').get_json()['analytics']
+    rewards = client.get(f'/api/rewards/{DEMO}').get_json()['rewards']
+    assert analytics['symptom_frequency']['Cramps'] == before_analytics['symptom_frequency']['Cramps'] + 1
+    assert analytics['mood_distribution']['Stable'] == before_analytics['mood_distribution']['Stable'] + 1
+    assert rewards['points'] == before_rewards['points'] + 5
+
+
+def test_cycle_update_invalidates_analytics(client):
+    client.get(f'/api/analytics/{DEMO}')
+    client.post('/api/cycle', json={'user_id': DEMO, 'last_period_date': '2026-02-01', 'cycle_length': 31})
+    analytics = client.get(f'/api/analytics/{DEMO}').get_json()['analytics']
+    assert analytics['average_cycle_length'] == 31
+
+
+def test_invite_invalidates_rewards(client):
+    before = client.get(f'/api/rewards/{DEMO}').get_json()['rewards']
+    client.post('/api/inner-circle/invite', json={'user_id': DEMO, 'friend_email': 'lee@example.com'})
+    after = client.get(f'/api/rewards/{DEMO}').get_json()['rewards']
+    assert after['points'] == before['points'] + 15
+
+
+def test_unknown_users_get_defaults_without_caching(client):
+    for i in range(20):
+        assert client.get(f'/api/analytics/rand{i}').status_code == 200
+        assert client.get(f'/api/rewards/rand{i}').status_code == 200
+    assert not cycora._analytics_cache and not cycora._rewards_cache
+
+    rewards = client.get('/api/rewards/nobody').get_json()['rewards']
+    assert rewards['points'] == 320
+    assert 'First Cycle Logged' not in [badge['name'] for badge in rewards['badges']]
+
+
+def test_settings_update_is_visible(client):
+    assert client.get(f'/api/settings/{DEMO}').get_json()['settings'] == cycora.DEFAULT_SETTINGS
+    client.put(f'/api/settings/{DEMO}', json={'show_country': True})
+    assert client.get(f'/api/settings/{DEMO}').get_json()['settings'] == {'show_country': True}
+
+
+def _race_rebuild_against_write(monkeypatch, renderer, read, write):
+    """Pause a cache rebuild after it has rendered, let a write run meanwhile,
+    then let the rebuild store its body. The lock around rebuild and write
+    must hold the write back, or the stale body outlives the invalidation."""
+    rendered, resume = threading.Event(), threading.Event()
+    real_render = getattr(cycora, renderer)
+
+    def paused_render(*args):
+        body = real_render(*args)
+        rendered.set()
+        resume.wait(5)
+        return body
+
+    monkeypatch.setattr(cycora, renderer, paused_render)
+    reader = threading.Thread(target=read)
+    writer = threading.Thread(target=write)
+    reader.start()
+    assert rendered.wait(5)
+    writer.start()
+    writer.join(0.2)    # with the lock held by the rebuild, the write can't finish yet
+    resume.set()
+    reader.join(5)
+    writer.join(5)
+
+
+def test_analytics_rebuild_cannot_outlive_a_racing_write(client, monkeypatch):
+    _race_rebuild_against_write(
+        monkeypatch, '_render_analytics',
+        read=lambda: cycora.app.test_client().get(f'/api/analytics/{DEMO}'),
+        write=lambda: cycora.app.test_client().post('/api/mood', json={'user_id': DEMO, 'mood': 'Racing'}),
+    )
+    analytics = client.get(f'/api/analytics/{DEMO}').get_json()['analytics']
+    assert analytics['mood_distribution'].get('Racing') == 1
+
+
+def test_feed_rebuild_cannot_outlive_a_racing_post(client, monkeypatch):
+    _race_rebuild_against_write(
+        monkeypatch, '_community_page',
+        read=lambda: cycora.app.test_client().get('/api/community/posts'),
+        write=lambda: cycora.app.test_client().post('/api/community/posts', json={'text': 'racing'}),
+    )
+    assert client.get('/api/community/posts').get_json()['posts'][0]['text'] == 'racing'
+
+
+# ── Community feed ────────────────────────────
+def test_new_post_invalidates_feed(client):
+    client.get('/api/community/posts')
+    assert cycora._community_cache
+
+    client.post('/api/community/posts', json={'text': 'hello', 'country': 'IN'})
+    assert not cycora._community_cache
+
+    feed = client.get('/api/community/posts').get_json()
+    assert feed['posts'][0]['text'] == 'hello'
+    assert feed['total'] == 6
+
+
+def test_support_and_reply_invalidate_feed(client):
+    post_id = client.get('/api/community/posts').get_json()['posts'][0]['id']
+
+    client.post(f'/api/community/posts/{post_id}/support')
+    post = client.get('/api/community/posts').get_json()['posts'][0]
+    supports = post['supports']
+
+    client.post(f'/api/community/posts/{post_id}/reply', json={'text': 'same here'})
+    post = client.get('/api/community/posts').get_json()['posts'][0]
+    assert post['supports'] == supports
+    assert post['replies'][-1]['text'] == 'same here'
+
+
+@pytest.mark.parametrize('query, expected_len', [
+    ('', 5),
+    ('?limit=2', 2),
+    ('?limit=0', 1),                   # clamped up to 1
+    ('?limit=-5', 1),
+    ('?limit=1000', 5),                # clamped down to COMMUNITY_MAX_PAGE_SIZE
+    ('?offset=3', 2),
+    ('?offset=3&limit=1', 1),
+    ('?offset=5', 0),
+    ('?offset=99', 0),
+    ('?offset=-4', 5),                 # clamped up to 0
+    ('?offset=abc&limit=xyz', 5),      # unparsable values are ignored
+])
+def test_feed_offset_limit_bounds(client, query, expected_len):
+    feed = client.get(f'/api/community/posts{query}').get_json()
+    assert len(feed['posts']) == expected_len
+    assert feed['total'] == 5
+
+
+def test_feed_pages_do_not_overlap(client):
+    newest = [post['id'] for post in reversed(cycora.community_posts_db)]
+    first = client.get('/api/community/posts?limit=2').get_json()['posts']
+    second = client.get('/api/community/posts?offset=2&limit=2').get_json()['posts']
+    assert [post['id'] for post in first + second] == newest[:4]
+
+
+def test_limit_is_capped_but_unpaginated_feed_is_complete(client):
+    for i in range(cycora.COMMUNITY_MAX_PAGE_SIZE + 5):
+        client.post('/api/community/posts', json={'text': f'post {i}'})
+    total = cycora.COMMUNITY_MAX_PAGE_SIZE + 10
+    feed = client.get('/api/community/posts?limit=1000').get_json()
+    assert len(feed['posts']) == cycora.COMMUNITY_MAX_PAGE_SIZE
+    feed = client.get('/api/community/posts').get_json()
+    assert len(feed['posts']) == feed['total'] == total
+    assert feed['posts'][-1]['id'] == cycora.community_posts_db[0]['id']
+    assert len(client.get('/api/community/posts?offset=100').get_json()['posts']) == 10
+
+
+# ── Snapshots ─────────────────────────────────
+def test_snapshot_round_trip_rebuilds_indexes(client):
+    user_id = _register(client)
+    client.post('/api/inner-circle/invite', json={'user_id': user_id, 'friend_email': 'Pal@Example.com'})
+    post_id = client.post('/api/community/posts', json={'text': 'persist me'}).get_json()['post']['id']
+    cycora._write_snapshot()
+
+    # Wipe every store and index, then load the snapshot back
+    for store in (*cycora._SNAPSHOT_DICTS.values(), cycora.email_index,
+                  cycora.inner_circle_emails, cycora.community_posts_by_id):
+        store.clear()
+    cycora.community_posts_db.clear()
+    cycora._load_snapshot()
+
+    assert cycora.email_index['new@user.com'] == user_id
+    assert cycora.inner_circle_emails[user_id] == {'pal@example.com'}
+    assert cycora.community_posts_by_id[post_id] is cycora.community_posts_db[-1]
+
+    assert client.post('/api/login', json={'email': 'new@user.com', 'password': 'secret'}).status_code == 200
+    response = client.post('/api/inner-circle/invite', json={'user_id': user_id, 'friend_email': 'pal@example.com'})
+    assert response.status_code == 409
+    assert client.post(f'/api/community/posts/{post_id}/support').get_json()['supports'] == 1
+
+
+def test_snapshot_write_is_atomic_and_skips_unchanged_state(client, load_state_file):
+    cycora._write_snapshot()
+    first = load_state_file()
+    assert set(first) == {'users', 'cycles', 'moods', 'friends', 'settings', 'posts'}
+
+    assert os.stat(cycora.STATE_FILE).st_mode & 0o777 == 0o600
+    mtime = os.stat(cycora.STATE_FILE).st_mtime_ns
+    cycora._write_snapshot()
+    assert os.stat(cycora.STATE_FILE).st_mtime_ns == mtime
+    assert not os.path.exists(cycora.STATE_FILE + '.tmp')
+
+    client.post('/api/mood', json={'user_id': DEMO, 'mood': 'Stable'})
+    cycora._write_snapshot()
+    assert len(load_state_file()['moods'][DEMO]) == len(first['moods'][DEMO]) + 1
+
+
+def _run_in_forked_worker(body):
+    """Run body(client) in a child forked from the current (startup) state, like a
+    preloaded gunicorn worker, and report whether it returned True."""
+    pid = os.fork()
+    if pid == 0:
+        ok = False
+        try:
+            cycora.start_snapshotter()
+            ok = body(cycora.app.test_client())
+            cycora._write_snapshot()
+        finally:
+            os._exit(0 if ok else 1)
+    _, status = os.waitpid(pid, 0)
+    return os.waitstatus_to_exitcode(status) == 0
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs os.fork')
+def test_replacement_worker_keeps_newer_snapshot(load_state_file):
+    def first_worker(client):
+        return bool(_register(client))
+
+    def replacement_worker(client):
+        response = client.post('/api/login', json={'email': 'new@user.com', 'password': 'secret'})
+        return response.status_code == 200
+
+    assert _run_in_forked_worker(first_worker)
+    assert _run_in_forked_worker(replacement_worker)
+    assert 'new@user.com' in {user['email'] for user in load_state_file()['users'].values()}
+
+
+# ── Predictions ───────────────────────────────
+@pytest.mark.parametrize('last_period_date, accepted', [
+    ('2026-02-01', True),
+    ('2026-2-1', True),                # unpadded, as strptime allows
+    ('20260201', False),
+    ('2026-02-30', False),
+    ('', False),
+    (None, False),
+])
+def test_last_period_date_formats(client, last_period_date, accepted):
+    body = {'user_id': 'dates', 'last_period_date': last_period_date}
+    predictions = client.post('/api/cycle', json=body).get_json()['predictions']
+    assert (predictions is not None) == accepted
+    status = client.get('/api/prediction/dates').status_code
+    assert status == (200 if accepted else 400)
+
+
+def _baseline_predictions(last_period_date, cycle_length, period_length, now):
+    """The original strptime/while-loop/if-chain algorithm, as a reference."""
+    last_period = datetime.strptime(last_period_date, "%Y-%m-%d")
+    next_period = last_period + timedelta(days=cycle_length)
+    while next_period < now:
+        next_period += timedelta(days=cycle_length)
+
+    ovulation_date = next_period - timedelta(days=14)
+    fertile_start = ovulation_date - timedelta(days=2)
+    fertile_end = ovulation_date + timedelta(days=2)
+
+    days_since_period = (now - last_period).days % cycle_length
+    if days_since_period < period_length:
+        phase = "Menstrual"
+    elif days_since_period < 13:
+        phase = "Follicular"
+    elif days_since_period < 17:
+        phase = "Ovulation"
+    else:
+        phase = "Luteal"
+
+    return {
+        "next_period": next_period.strftime("%b %d"),
+        "next_period_full": next_period.strftime("%Y-%m-%d"),
+        "days_until_period": max(0, (next_period - now).days),
+        "ovulation_date": ovulation_date.strftime("%b %d"),
+        "fertile_start": fertile_start.strftime("%b %d"),
+        "fertile_end": fertile_end.strftime("%b %d"),
+        "fertile_window": f"{fertile_start.strftime('%b %d')}-{fertile_end.strftime('%b %d')}",
+        "phase": phase,
+        "day_of_cycle": days_since_period + 1,
+        "cycle_length": cycle_length,
+        "period_length": period_length,
+    }
+
+
+@pytest.mark.parametrize('cycle_length', [21, 28, 35])
+@pytest.mark.parametrize('period_length', [3, 5, 13, 15])
+def test_predictions_match_baseline_algorithm(cycle_length, period_length):
+    today = datetime(2026, 3, 15)
+    now = datetime.combine(today, time(12))    # the baseline used datetime.now()
+    for days_ago in range(0, 3 * cycle_length + 2):
+        last_period_date = (today - timedelta(days=days_ago)).strftime("%Y-%m-%d")
+        expected = _baseline_predictions(last_period_date, cycle_length, period_length, now)
+        actual = cycora._cached_predictions(last_period_date, cycle_length, period_length, today.toordinal())
+        assert {key: actual[key] for key in expected} == expected, last_period_date
+        assert (actual['phase'], actual['phase_description'], actual['mood_tip']) in cycora.PHASE_TABLE